@@ -0,0 +1,63 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Tech Services.py')
+
+
+def load_app():
+    # The script draws the Streamlit UI as soon as it runs; the database layer sits above
+    # the session-state section, so only that part is executed
+    with open(SOURCE, encoding='utf-8') as f:
+        source = f.read()
+    namespace = {'__name__': 'tech_services', '__file__': SOURCE}
+    exec(compile(source[:source.index('# ==================== SESSION STATE')], SOURCE, 'exec'), namespace)
+    return SimpleNamespace(**namespace)
+
+
+@pytest.fixture(scope='session')
+def app():
+    return load_app()
+
+
+@pytest.fixture
+def open_db(app, tmp_path):
+    # Cheap scrypt keeps seeding fast; every manager opened is closed after the test
+    managers = []
+
+    def open_db(path=None, **kwargs):
+        kwargs.setdefault('password_hasher', app.PasswordHasher(scrypt_log_n=4, workers=1))
+        db = app.DatabaseManager(str(path or tmp_path / 'test.db'), **kwargs)
+        managers.append(db)
+        return db
+
+    yield open_db
+    for db in managers:
+        db.close()
+
+
+@pytest.fixture
+def db(open_db):
+    return open_db()
+
+
+def query(db, sql, params=()):
+    with db.pool.reader() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def execute(db, sql, params=()):
+    with db.pool.writer() as conn:
+        conn.execute(sql, params)
+    # Raw writes bypass @invalidates, so cached reads would be stale
+    if db.cache:
+        db.cache.clear()
+
+
+def user_id(db, email):
+    return query(db, 'SELECT id FROM users WHERE email = ?', (email,))[0][0]
+
+
+def service_id(db, name):
+    return query(db, 'SELECT id FROM services WHERE name = ?', (name,))[0][0]
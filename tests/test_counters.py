@@ -0,0 +1,109 @@
+from conftest import execute, query, service_id, user_id
+
+# What the counter tables would hold if rebuilt from the base tables right now
+UNREAD_RECOMPUTED = '''
+SELECT cm.order_key, CASE WHEN cm.sender_id = o.user_id THEN 'technical' ELSE 'user' END,
+       o.user_id, o.status, COUNT(*)
+FROM chat_messages cm
+JOIN orders o ON cm.order_key = o.order_key
+WHERE cm.is_read = 0
+GROUP BY 1, 2
+'''
+
+
+def assert_unread_exact(db):
+    stored = query(db, 'SELECT order_key, recipient_role, user_id, status, count FROM unread_counters')
+    assert sorted(stored) == sorted(query(db, UNREAD_RECOMPUTED))
+
+
+def assert_stats_exact(app, db):
+    # Triggers only decrement, so names whose rows are all gone stay behind at zero
+    stored = {name: (count, amount) for name, count, amount in
+              query(db, 'SELECT name, count, amount FROM stats_counters') if count}
+    assert stored == {name: (count, amount) for name, count, amount in query(db, app.DASHBOARD_STATS_SQL)}
+    assert db.get_dashboard_stats() == db.get_dashboard_stats(exact=True)
+
+
+def place_orders(db, count):
+    customer = user_id(db, 'user@example.com')
+    service = service_id(db, 'Plumbing Repair')
+    return [db.create_order(customer, service, '2026-01-0%d' % (i + 1), 'Cash', '', 80.0 + i)[1]
+            for i in range(count)]
+
+
+def test_unread_counters_follow_inserts_reads_and_deletes(db):
+    customer = user_id(db, 'user@example.com')
+    tech = user_id(db, 'tech@example.com')
+    first, second = place_orders(db, 2)
+    for order_id, sender, text in [(first, customer, 'Is Monday fine?'), (first, customer, 'Any time works'),
+                                   (first, tech, 'Monday at 10'), (second, tech, 'On my way')]:
+        assert db.save_chat_message(order_id, sender, text)
+    assert_unread_exact(db)
+    assert db.get_unread_message_count(customer, 'user') == 2
+    assert db.get_unread_message_count(tech, 'technical') == 2
+
+    # The technician reads the customer's messages; the customer's own stay unread
+    assert db.mark_messages_as_read(first, tech)
+    assert_unread_exact(db)
+    assert db.get_unread_message_count(tech, 'technical') == 0
+    assert db.get_unread_message_count(customer, 'user') == 2
+
+    execute(db, 'UPDATE chat_messages SET is_read = 0 WHERE sender_id = ?', (customer,))
+    assert_unread_exact(db)
+
+    execute(db, "DELETE FROM chat_messages WHERE message = 'On my way'")
+    assert_unread_exact(db)
+    assert db.get_unread_message_count(customer, 'user') == 1
+
+
+def test_unread_counters_follow_order_status_and_deletion(db):
+    customer = user_id(db, 'user@example.com')
+    tech = user_id(db, 'tech@example.com')
+    first, second = place_orders(db, 2)
+    db.save_chat_message(first, customer, 'Please call first')
+    db.save_chat_message(second, customer, 'Gate code is 1234')
+    assert db.get_unread_message_count(tech, 'technical') == 2
+
+    # Technicians only see badges for pending orders
+    assert db.update_order_status(first, 'In Progress')
+    assert_unread_exact(db)
+    assert db.get_unread_message_count(tech, 'technical') == 1
+
+    execute(db, 'DELETE FROM chat_messages WHERE order_key = (SELECT order_key FROM orders WHERE id = ?)',
+            (second,))
+    execute(db, 'DELETE FROM orders WHERE id = ?', (second,))
+    assert_unread_exact(db)
+    assert query(db, 'SELECT COUNT(*) FROM unread_counters')[0][0] == 1
+
+
+def test_stats_counters_follow_inserts_updates_and_deletes(app, db):
+    assert_stats_exact(app, db)
+    orders = place_orders(db, 3)
+    assert db.register_user('new.tech@example.com', 'secret', 'New Tech', 'technical')[0]
+    assert_stats_exact(app, db)
+
+    assert db.update_order_status(orders[0], 'Done')
+    assert db.update_order_status(orders[1], 'Cancelled')
+    execute(db, 'UPDATE orders SET price = price + 20 WHERE id = ?', (orders[0],))
+    execute(db, "UPDATE users SET role = 'user' WHERE email = 'new.tech@example.com'")
+    assert_stats_exact(app, db)
+    assert db.get_dashboard_stats()['revenue'] == 100.0
+
+    execute(db, 'DELETE FROM orders WHERE id = ?', (orders[0],))
+    execute(db, "DELETE FROM users WHERE email = 'new.tech@example.com'")
+    execute(db, "DELETE FROM services WHERE name = 'Locksmith'")
+    execute(db, "INSERT INTO services (name, category, price) VALUES ('Gardening', 'Home', 40)")
+    assert_stats_exact(app, db)
+
+
+def test_stats_counters_rebuilt_when_a_trigger_is_missing(app, open_db, tmp_path):
+    db = open_db()
+    place_orders(db, 2)
+    execute(db, 'DROP TRIGGER trg_stats_orders_insert')
+    db.close()
+
+    db = open_db()
+    triggers = {name for name, in query(db, "SELECT name FROM sqlite_master WHERE name LIKE 'trg_stats_%'")}
+    assert triggers == set(app.STATS_COUNTERS_TRIGGERS)
+    place_orders(db, 1)
+    assert_stats_exact(app, db)
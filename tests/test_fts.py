@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from conftest import execute, query, service_id, user_id
+
+FTS_TABLES = ['services_fts', 'chat_messages_fts', 'contact_messages_fts']
+
+
+def assert_index_matches_content(db):
+    # With rank 1 the check also compares every index entry against the content table
+    for fts in FTS_TABLES:
+        execute(db, f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+
+
+def found(results):
+    rows, _ = results
+    return [row['id'] for row in rows]
+
+
+def test_integrity_check_catches_a_stale_index(db):
+    assert_index_matches_content(db)
+    execute(db, 'DROP TRIGGER trg_services_fts_update')
+    execute(db, "UPDATE services SET name = 'Roof Repair' WHERE name = 'Locksmith'")
+    with pytest.raises(sqlite3.DatabaseError):
+        assert_index_matches_content(db)
+
+
+def test_service_index_follows_edits(db):
+    locksmith = service_id(db, 'Locksmith')
+    assert found(db.search_services('locksm')) == [locksmith]
+
+    execute(db, "UPDATE services SET name = 'Door Security', description = 'Smart lock fitting' "
+                "WHERE id = ?", (locksmith,))
+    assert found(db.search_services('locksmith')) == []
+    assert found(db.search_services('door secur')) == [locksmith]
+    # Columns outside the index do not touch it
+    execute(db, 'UPDATE services SET price = 65, rating = 4.1 WHERE id = ?', (locksmith,))
+    assert found(db.search_services('door')) == [locksmith]
+
+    execute(db, "INSERT INTO services (name, category, price, description) "
+                "VALUES ('Garden Care', 'Home', 40, 'Lawn mowing and hedge trimming')")
+    garden = service_id(db, 'Garden Care')
+    assert found(db.search_services('hedge')) == [garden]
+
+    execute(db, 'DELETE FROM services WHERE id = ?', (locksmith,))
+    assert found(db.search_services('door')) == []
+    assert_index_matches_content(db)
+
+
+def test_chat_index_follows_edits(db):
+    customer = user_id(db, 'user@example.com')
+    tech = user_id(db, 'tech@example.com')
+    order_id = db.create_order(customer, service_id(db, 'Air Conditioning'), '2026-04-01', 'Cash', '', 120.0)[1]
+    db.save_chat_message(order_id, customer, 'The compressor makes a rattling noise')
+    db.save_chat_message(order_id, tech, 'I will bring a spare compressor')
+    rows, _ = db.search_chat_messages('compressor')
+    assert len(rows) == 2 and {row['order_id'] for row in rows} == {order_id}
+    assert '<mark>' in rows[0]['snippet']
+
+    # Reading messages flips is_read only, which the update trigger ignores
+    db.mark_messages_as_read(order_id, tech)
+    assert len(found(db.search_chat_messages('compressor'))) == 2
+
+    execute(db, "UPDATE chat_messages SET message = 'The fan makes a rattling noise' WHERE sender_id = ?",
+            (customer,))
+    assert len(found(db.search_chat_messages('compressor'))) == 1
+    assert len(found(db.search_chat_messages('fan rattl'))) == 1
+
+    execute(db, 'DELETE FROM chat_messages WHERE sender_id = ?', (tech,))
+    assert found(db.search_chat_messages('compressor')) == []
+    assert_index_matches_content(db)
+
+
+def test_contact_index_follows_edits(db):
+    db.save_contact_message('Mona Adel', 'mona@example.com', 'Invoice question', 'I was billed twice')
+    db.save_contact_message('Omar Said', 'omar@example.com', 'Feedback', 'Great plumber, quick visit')
+    assert len(found(db.search_contact_messages('billed'))) == 1
+    assert len(found(db.search_contact_messages('omar'))) == 1
+
+    execute(db, "UPDATE contact_messages SET status = 'Read', subject = 'Refund request' "
+                "WHERE email = 'mona@example.com'")
+    assert found(db.search_contact_messages('invoice')) == []
+    assert len(found(db.search_contact_messages('refund'))) == 1
+
+    execute(db, "DELETE FROM contact_messages WHERE email = 'omar@example.com'")
+    assert found(db.search_contact_messages('plumber')) == []
+    assert_index_matches_content(db)
+
+
+def test_search_input_is_not_parsed_as_query_syntax(db):
+    assert db.search_services('') == ([], False)
+    assert db.search_services('"') == ([], False)
+    assert found(db.search_services('clean OR NOT "home')) == []
+    assert len(found(db.search_services('clean*'))) == 2
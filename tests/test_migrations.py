@@ -0,0 +1,108 @@
+import logging
+import sqlite3
+import uuid
+
+from conftest import query, service_id, user_id
+
+FIRST, SECOND, GONE = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+
+
+def build_baseline(open_db, path):
+    # schema_version=0 stops before the first migration, leaving the tables the app
+    # shipped with before user_version was tracked
+    db = open_db(path, schema_version=0, stats_counters=False)
+    customer = user_id(db, 'user@example.com')
+    tech = user_id(db, 'tech@example.com')
+    plumbing = service_id(db, 'Plumbing Repair')
+    painting = service_id(db, 'Painting Service')
+    db.close()
+
+    conn = sqlite3.connect(path)
+    with conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+        conn.executemany('''
+        INSERT INTO orders (id, user_id, service_id, booking_date, status, price, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(SECOND, customer, painting, '2026-02-10', 'Done', 200.0, '2026-02-01 09:00:00'),
+              (FIRST, customer, plumbing, '2026-01-10', 'Pending', 80.0, '2026-01-01 09:00:00')])
+        conn.executemany('''
+        INSERT INTO chat_messages (order_id, sender_id, message, is_read, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        ''', [(FIRST, customer, 'The kitchen sink drips', 0, '2026-01-01 10:00:00'),
+              (FIRST, tech, 'I can come on Friday', 1, '2026-01-01 11:00:00'),
+              (FIRST, customer, 'Friday works', 0, '2026-01-01 12:00:00'),
+              (SECOND, tech, 'Which colour for the hallway?', 0, '2026-02-01 10:00:00'),
+              (GONE, customer, 'Order that was deleted', 0, '2026-01-15 10:00:00')])
+        conn.executemany('INSERT INTO order_technicians (order_id, technician_id) VALUES (?, ?)',
+                         [(FIRST, tech), (GONE, tech)])
+    conn.close()
+    return customer, tech
+
+
+def test_baseline_database_migrates_to_latest_version(app, open_db, tmp_path, caplog):
+    path = str(tmp_path / 'baseline.db')
+    customer, tech = build_baseline(open_db, path)
+
+    with caplog.at_level(logging.WARNING):
+        db = open_db(path)
+    assert query(db, 'PRAGMA user_version')[0][0] == app.MIGRATIONS[-1][0] == 8
+    assert query(db, 'PRAGMA integrity_check') == [('ok',)]
+    assert query(db, 'PRAGMA foreign_key_check') == []
+
+    # Keys follow creation order, and the UUIDs and order fields survive the rebuild
+    assert query(db, 'SELECT order_key, id, status, price FROM orders ORDER BY order_key') == [
+        (1, FIRST, 'Pending', 80.0), (2, SECOND, 'Done', 200.0)]
+    messages = db.get_chat_messages(FIRST)
+    assert [(m.id, m.order_id, m.message, m.is_read) for m in messages] == [
+        (1, FIRST, 'The kitchen sink drips', 0), (2, FIRST, 'I can come on Friday', 1),
+        (3, FIRST, 'Friday works', 0)]
+    assert db.get_order_details(FIRST)['technician_name'] == 'Demo Tech'
+
+    # Rows for the missing order are dropped, and the drop is logged
+    assert query(db, 'SELECT COUNT(*) FROM chat_messages')[0][0] == 4
+    assert query(db, 'SELECT COUNT(*) FROM order_technicians')[0][0] == 1
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert 'Dropping 1 chat_messages row(s) for orders that no longer exist' in warnings
+    assert 'Dropping 1 order_technicians row(s) for orders that no longer exist' in warnings
+
+    # Derived tables are rebuilt from the migrated rows
+    assert db.get_unread_message_count(tech, 'technical') == 2
+    assert db.get_unread_message_count(customer, 'user') == 1
+    assert [r['order_id'] for r in db.search_chat_messages('sink')[0]] == [FIRST]
+    assert db.search_chat_messages('deleted') == ([], False)
+    assert db.get_dashboard_stats() == db.get_dashboard_stats(exact=True)
+    assert db.get_dashboard_stats()['revenue'] == 200.0
+    indexes = {name for name, in query(db, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_chat_messages_order_id', 'idx_orders_created_id', 'idx_unread_counters_user'} <= indexes
+
+    # Writes after the migration go through the new keys and triggers
+    assert db.save_chat_message(FIRST, customer, 'Please ring the bell')
+    assert db.get_unread_message_count(tech, 'technical') == 3
+    assert [r['order_id'] for r in db.search_chat_messages('bell')[0]] == [FIRST]
+
+
+def test_migrations_are_not_reapplied(open_db, tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    build_baseline(open_db, path)
+    db = open_db(path)
+    before = query(db, 'SELECT order_key, id FROM orders ORDER BY order_key')
+    schema = query(db, 'SELECT type, name, sql FROM sqlite_master ORDER BY name')
+    db.close()
+
+    db = open_db(path)
+    assert query(db, 'PRAGMA user_version')[0][0] == 8
+    assert query(db, 'SELECT order_key, id FROM orders ORDER BY order_key') == before
+    assert query(db, 'SELECT type, name, sql FROM sqlite_master ORDER BY name') == schema
+
+
+def test_migration_stopped_early_resumes_at_next_version(open_db, tmp_path):
+    path = str(tmp_path / 'partial.db')
+    db = open_db(path, schema_version=7)
+    assert query(db, 'PRAGMA user_version')[0][0] == 7
+    assert 'order_id' in {row[1] for row in query(db, 'PRAGMA table_info(chat_messages)')}
+    db.close()
+
+    db = open_db(path)
+    assert query(db, 'PRAGMA user_version')[0][0] == 8
+    assert 'order_key' in {row[1] for row in query(db, 'PRAGMA table_info(chat_messages)')}
+    assert query(db, 'PRAGMA integrity_check') == [('ok',)]
@@ -0,0 +1,88 @@
+from conftest import service_id, user_id
+
+
+def served_from_cache(db, read):
+    # Runs `read` and reports whether it was a cache hit
+    hits = db.get_cache_stats()['hits']
+    result = read()
+    return db.get_cache_stats()['hits'] > hits, result
+
+
+def test_repeated_reads_are_served_from_cache(db):
+    first = db.get_services('Home')
+    hit, second = served_from_cache(db, lambda: db.get_services('Home'))
+    assert hit and second is first
+    # Different arguments are a different entry
+    assert not served_from_cache(db, lambda: db.get_services('Tech'))[0]
+    assert not served_from_cache(db, lambda: db.get_services(category='Tech'))[0]
+
+
+def test_writes_invalidate_only_reads_of_their_tables(db):
+    customer = user_id(db, 'user@example.com')
+    service = service_id(db, 'House Cleaning')
+    db.get_services()
+    db.get_user_orders(customer)
+    db.get_user_profile(customer)
+    db.search_contact_messages('boiler')
+
+    ok, order_id = db.create_order(customer, service, '2026-03-01', 'Cash', '', 50.0)
+    assert ok
+    hit, orders = served_from_cache(db, lambda: db.get_user_orders(customer))
+    assert not hit and [o.id for o in orders] == [order_id]
+    assert served_from_cache(db, db.get_services)[0]
+    assert served_from_cache(db, lambda: db.get_user_profile(customer))[0]
+    assert served_from_cache(db, lambda: db.search_contact_messages('boiler'))[0]
+
+    assert db.update_user_profile(customer, 'Renamed User', '+20100', 'bio')
+    hit, profile = served_from_cache(db, lambda: db.get_user_profile(customer))
+    assert not hit and profile['name'] == 'Renamed User'
+    assert served_from_cache(db, lambda: db.get_user_orders(customer))[0]
+
+    assert db.save_contact_message('Mona', 'mona@example.com', 'Boiler', 'The boiler is leaking')
+    hit, (results, _) = served_from_cache(db, lambda: db.search_contact_messages('boiler'))
+    assert not hit and len(results) == 1
+    assert served_from_cache(db, db.get_services)[0]
+
+
+def test_reads_spanning_several_tables_follow_each_of_them(db):
+    customer = user_id(db, 'user@example.com')
+    tech = user_id(db, 'tech@example.com')
+    service = service_id(db, 'Tech Support')
+    order_id = db.create_order(customer, service, '2026-03-02', 'Card', '', 60.0)[1]
+    assert db.get_order_details(order_id)['technician_name'] is None
+    assert db.get_unread_message_count(tech, 'technical') == 0
+
+    assert db.assign_technician_to_order(order_id, tech)
+    assert db.get_order_details(order_id)['technician_name'] == 'Demo Tech'
+    assert served_from_cache(db, lambda: db.get_unread_message_count(tech, 'technical'))[0]
+
+    assert db.save_chat_message(order_id, customer, 'Laptop will not boot')
+    assert db.get_unread_message_count(tech, 'technical') == 1
+    assert db.update_order_status(order_id, 'In Progress')
+    assert db.get_unread_message_count(tech, 'technical') == 0
+
+
+def test_entries_expire_after_ttl(open_db):
+    db = open_db(cache_ttl=0)
+    db.get_services()
+    assert not served_from_cache(db, db.get_services)[0]
+
+
+def test_cache_can_be_disabled(open_db):
+    db = open_db(cache_size=0)
+    assert db.cache is None and db.get_cache_stats() is None
+    assert len(db.get_services()) == 10
+
+
+def test_bump_only_stales_entries_stamped_with_that_table(app):
+    cache = app.QueryCache(max_entries=2, ttl=60)
+    cache.put('orders', cache.stamp(('orders',)), 1)
+    cache.put('services', cache.stamp(('services',)), 2)
+    cache.bump(('orders',))
+    assert cache.get('orders', ('orders',)) == (False, None)
+    assert cache.get('services', ('services',)) == (True, 2)
+
+    cache.put('users', cache.stamp(('users',)), 3)
+    cache.put('chat', cache.stamp(('chat_messages',)), 4)
+    assert cache.stats()['entries'] == 2 and cache.stats()['evictions'] == 1
+    assert cache.get('services', ('services',)) == (False, None)